@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse, sys, os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from google import genai
 from google.genai import types
@@ -11,6 +12,9 @@ try:
 except Exception:
     pass
 
+# In --stream mode, buffer up to this much text between flushes
+STREAM_FLUSH_CHARS = 64 * 1024
+
 def read_stdin_if_piped() -> str | None:
     if not sys.stdin.isatty():
         data = sys.stdin.read()
@@ -42,27 +46,16 @@ def resolve_api_key(cli_key: str | None) -> str:
 def print_with_citations(resp):
     """Print text and any grounded web citations (non-streaming mode only)."""
     txt = getattr(resp, "text", "") or ""
-    printed_sources = False
     try:
-        cand = resp.candidates[0]
-        gm = getattr(cand, "grounding_metadata", None)
-        if gm:
-            chunks = getattr(gm, "grounding_chunks", []) or []
-            links = []
-            for i, ch in enumerate(chunks, 1):
-                web = getattr(ch, "web", None)
-                if web and getattr(web, "uri", None):
-                    title = (web.title or web.uri).strip()
-                    links.append(f"[{i}] {title} — {web.uri}")
-            if links:
-                print(txt)
-                print("\nSources:")
-                for s in links:
-                    print(" -", s)
-                printed_sources = True
-    except Exception:
-        pass
-    if not printed_sources:
+        chunks = resp.candidates[0].grounding_metadata.grounding_chunks or []
+    except (AttributeError, IndexError, TypeError):
+        chunks = []
+    links = [f" - [{i}] {(w.title or w.uri).strip()} — {w.uri}"
+             for i, ch in enumerate(chunks, 1)
+             if (w := getattr(ch, "web", None)) and w.uri]
+    if links:
+        sys.stdout.write(f"{txt}\n\nSources:\n" + "\n".join(links) + "\n")
+    else:
         print(txt)
 
 def main():
@@ -101,11 +94,11 @@ def main():
     api_key = resolve_api_key(args.api_key)
     client = genai.Client(api_key=api_key)
 
-    # attachments
+    # attachments (uploaded in parallel; map() keeps them in --attach order)
     uploaded = []
     if args.attach:
-        for path in args.attach:
-            uploaded.append(client.files.upload(file=path))
+        with ThreadPoolExecutor(max_workers=min(8, len(args.attach))) as ex:
+            uploaded = list(ex.map(lambda path: client.files.upload(file=path), args.attach))
 
     # request args
     gen_args = {
@@ -138,11 +131,22 @@ def main():
     try:
         if args.stream:
             # Stream text only; citations appear only in non-streaming responses.
+            # Flush the first chunk (first-token latency), then only on newlines or
+            # every STREAM_FLUSH_CHARS instead of one write syscall per token.
             stream = client.models.generate_content_stream(**gen_args)
+            out = sys.stdout
+            first, pending = True, 0
             for chunk in stream:
-                if getattr(chunk, "text", None):
-                    print(chunk.text, end="", flush=True)
-            print()
+                text = getattr(chunk, "text", None)
+                if not text:
+                    continue
+                out.write(text)
+                pending += len(text)
+                if first or "\n" in text or pending >= STREAM_FLUSH_CHARS:
+                    out.flush()
+                    first, pending = False, 0
+            out.write("\n")
+            out.flush()
         else:
             resp = client.models.generate_content(**gen_args)
             if args.web and args.cite:
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
-import os, json, requests
+import os, json, time, hashlib, functools, threading, requests
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -9,6 +10,21 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL   = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 STATION_NAME   = os.getenv("STATION_NAME", "Qualisys FM")
 
+# One keep-alive pool for the whole show: no fresh TCP+TLS handshake per track
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+# Host lines are reused for the same song+headline within the same hour
+OUTDIR = Path("cache/host")
+OUTDIR.mkdir(parents=True, exist_ok=True)
+# Entries are keyed by hour, so past this age none can be hit again (2h: slack for clock/DST)
+MAX_AGE = 2 * 3600
+
+@functools.lru_cache(maxsize=256)
+def _memo_slot(h:str)->dict:
+    # one slot per key, filled by craft_host_text; the 256 most recent keys stay in memory
+    return {}
+
 SYS = (
 "You are “Mister Q”, a punchy radio host for a dev-friendly station. "
 "English. Keep lines short, pronounceable, swagger but no cringe. "
@@ -16,6 +32,38 @@ SYS = (
 )
 
 def craft_host_text(song_title:str, song_artist:str, headline:str, now_local:str)->dict:
+    # "2025-01-01 18:42" and ISO "2025-01-01T18:42:07" both bucket to "2025-01-01 18"
+    hour = now_local[:13].replace("T", " ")
+    h = hashlib.sha256("|".join([OPENAI_MODEL, SYS, song_title, song_artist, headline, hour]).encode("utf-8")).hexdigest()[:16]
+    slot = _memo_slot(h)
+    if not slot:
+        out = OUTDIR / f"host_{h}.json"
+        try:
+            slot.update(json.loads(out.read_text(encoding="utf-8")))
+        except (OSError, ValueError):  # missing, torn or corrupt: ask again
+            slot.update(_ask_openai(song_title, song_artist, headline, now_local))
+            try:
+                _store(out, slot)
+            except OSError:
+                pass  # still good for this run, just not persisted
+    return dict(slot)
+
+def _store(out:Path, data:dict):
+    # atomic: a crash mid-write never leaves a torn entry (per-thread tmp: safe from any caller)
+    tmp = out.with_name(f"{out.name}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, out)
+    # drop entries (and stray tmps) from hours that are long gone
+    now = time.time()
+    with os.scandir(OUTDIR) as it:
+        for e in it:
+            try:
+                if now - e.stat().st_mtime >= MAX_AGE:
+                    os.unlink(e.path)
+            except OSError:
+                pass
+
+def _ask_openai(song_title:str, song_artist:str, headline:str, now_local:str)->dict:
     payload = {
         "model": OPENAI_MODEL,
         "messages": [
@@ -31,7 +79,7 @@ def craft_host_text(song_title:str, song_artist:str, headline:str, now_local:str
         "temperature": 0.6,
         "max_tokens": 200
     }
-    r = requests.post(
+    r = SESSION.post(
         "https://api.openai.com/v1/chat/completions",
         headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
         json=payload, timeout=60
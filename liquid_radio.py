@@ -1,16 +1,62 @@
 #!/usr/bin/env python3
 # liquid_radio.py — tiny: download -> append to M3U -> sprinkle jingles, with logs + fallback
-import argparse, random, shlex, subprocess, sys
+import argparse, json, os, random, shlex, subprocess, sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 
+from radio_runner import parse_id
+
 DEF_YTDLP = "yt-dlp"
+AUDIO_EXTS = frozenset({".mp3", ".m4a", ".flac", ".wav"})
+
+def scan_audio(root: str, dirs: dict, files: List[str]) -> None:
+    # os.scandir walk: no Path objects or extra stat calls for rejected entries
+    with os.scandir(root) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False):
+                dirs[e.path] = e.stat(follow_symlinks=False).st_mtime_ns
+                scan_audio(e.path, dirs, files)
+            elif e.name[-4:].lower() in AUDIO_EXTS or e.name[-5:].lower() in AUDIO_EXTS:
+                files.append(e.path)
+
+def load_jingles(jdir: Path, index: Path) -> List[Path]:
+    """Audio files under jdir; reuses `index` while no directory in the tree has changed mtime."""
+    root = str(jdir.resolve())
+    try:
+        cached = json.loads(index.read_text(encoding="utf-8"))
+        if cached["root"] == root and all(os.stat(d).st_mtime_ns == m for d, m in cached["dirs"].items()):
+            return [Path(f) for f in cached["files"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    dirs = {root: os.stat(root).st_mtime_ns}
+    files: List[str] = []
+    scan_audio(root, dirs, files)
+    try:
+        index.parent.mkdir(parents=True, exist_ok=True)
+        index.write_text(json.dumps({"root": root, "dirs": dirs, "files": files}), encoding="utf-8")
+    except OSError:
+        pass  # no index next time, that's all
+    return [Path(f) for f in files]
+
+def cpus() -> int:
+    # CPUs we may actually run on (cgroup/taskset aware); cpu_count() overreports in containers
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def jingle_deck(jingles: List[Path]):
+    # shuffle once per pass through the list instead of an RNG call per pick
+    deck = list(jingles)
+    while True:
+        random.shuffle(deck)
+        yield from deck
 
 def run(cmd: List[str]) -> subprocess.CompletedProcess:
     return subprocess.run(cmd, capture_output=True, text=True)
 
 def dl_extract(ytdlp: str, url: str, outdir: Path, extra: List[str]) -> Optional[Path]:
-    outdir.mkdir(parents=True, exist_ok=True)
     tpl = str(outdir / "%(title).200s [%(id)s].%(ext)s")
     cmd = [ytdlp, "--no-playlist",
            "-x","--audio-format","m4a","--audio-quality","0",
@@ -21,11 +67,10 @@ def dl_extract(ytdlp: str, url: str, outdir: Path, extra: List[str]) -> Optional
     if p.returncode != 0 or not p.stdout.strip():
         sys.stderr.write(f"[yt-dlp extract FAIL] {url}\nSTDERR:\n{p.stderr}\n")
         return None
-    pth = Path(p.stdout.strip().splitlines()[-1])
-    return pth if pth.exists() else None
+    # after_move:filepath is only printed once the file is in place
+    return Path(p.stdout.strip().splitlines()[-1])
 
 def dl_direct(ytdlp: str, url: str, outdir: Path, extra: List[str]) -> Optional[Path]:
-    outdir.mkdir(parents=True, exist_ok=True)
     tpl = str(outdir / "%(title).200s [%(id)s].%(ext)s")
     cmd = [ytdlp, "--no-playlist",
            "-f","bestaudio/best",
@@ -36,8 +81,8 @@ def dl_direct(ytdlp: str, url: str, outdir: Path, extra: List[str]) -> Optional[
     if p.returncode != 0 or not p.stdout.strip():
         sys.stderr.write(f"[yt-dlp direct FAIL] {url}\nSTDERR:\n{p.stderr}\n")
         return None
-    pth = Path(p.stdout.strip().splitlines()[-1])
-    return pth if pth.exists() else None
+    # after_move:filepath is only printed once the file is in place
+    return Path(p.stdout.strip().splitlines()[-1])
 
 def download(ytdlp: str, url: str, outdir: Path, extra: List[str]) -> Optional[Path]:
     # 1) try extract (m4a); 2) fallback to direct bestaudio
@@ -53,6 +98,7 @@ def main():
     ap.add_argument("--period", type=int, default=3, help="play 1 jingle after N songs (0=off)")
     ap.add_argument("--m3u", default="radio.m3u")
     ap.add_argument("--ytdlp", default=DEF_YTDLP)
+    ap.add_argument("--concurrency", type=int, default=min(8, 2 * cpus()), help="parallel yt-dlp downloads")
     ap.add_argument("--ytdlp-arg", action="append", default=[],
                     help="repeatable yt-dlp arg, e.g. --ytdlp-arg=--cookies-from-browser --ytdlp-arg=chrome")
     args = ap.parse_args()
@@ -65,7 +111,7 @@ def main():
         sys.stderr.write("[!] no urls\n"); sys.exit(2)
 
     jingles_dir = Path(args.jingles)
-    jingles = [p for p in jingles_dir.rglob("*") if p.suffix.lower() in (".mp3",".m4a",".flac",".wav")] if jingles_dir.exists() else []
+    jingles = load_jingles(jingles_dir, Path(args.cache) / "jingles.index.json") if jingles_dir.exists() else []
     if args.period>0 and not jingles:
         sys.stderr.write("[i] no jingles found; disabling\n"); args.period=0
 
@@ -74,21 +120,37 @@ def main():
         m3u.write_text("#EXTM3U\n", encoding="utf-8")
 
     song_count = 0
-    for u in urls:
-        fp = download(args.ytdlp, u, Path(args.cache), args.ytdlp_arg)
-        if not fp:
-            sys.stderr.write(f"[!] skip failed: {u}\n")
-            continue
-        with m3u.open("a", encoding="utf-8") as f:
-            f.write(f"#EXTINF:-1,{fp.stem}\n{fp.as_posix()}\n")
-        song_count += 1
-        print(f"[+] queued: {fp.name}")
-
-        if args.period>0 and song_count % args.period == 0 and jingles:
-            j = random.choice(jingles)
-            with m3u.open("a", encoding="utf-8") as f:
-                f.write(f"#EXTINF:-1,{j.stem}\n{j.as_posix()}\n")
-            print(f"[♪] jingle: {j.name}")
+    cache = Path(args.cache)
+    cache.mkdir(parents=True, exist_ok=True)  # once here, not per download
+    picks = jingle_deck(jingles)
+    # threads just wait on yt-dlp children; map() hands results back in URL order
+    pool = ThreadPoolExecutor(max_workers=max(1, args.concurrency))
+    try:
+        # one handle for the whole run; flushed per track since liquidsoap re-reads the file
+        with m3u.open("a", encoding="utf-8", buffering=8192) as m3u_fh:
+            # one download per video: repeats (also youtu.be/X vs watch?v=X) share the first
+            # future instead of racing it on the same --no-part output file
+            futs = {}
+            for u in urls:
+                key = parse_id(u) or u
+                if key not in futs:
+                    futs[key] = pool.submit(download, args.ytdlp, u, cache, args.ytdlp_arg)
+            for u in urls:
+                fp = futs[parse_id(u) or u].result()
+                if not fp:
+                    sys.stderr.write(f"[!] skip failed: {u}\n")
+                    continue
+                m3u_fh.write(f"#EXTINF:-1,{fp.stem}\n{fp.as_posix()}\n")
+                song_count += 1
+                print(f"[+] queued: {fp.name}")
+
+                if args.period>0 and song_count % args.period == 0 and jingles:
+                    j = next(picks)
+                    m3u_fh.write(f"#EXTINF:-1,{j.stem}\n{j.as_posix()}\n")
+                    print(f"[♪] jingle: {j.name}")
+                m3u_fh.flush()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     main()
@@ -5,14 +5,36 @@
 # Author: Shishou 😈 (anti-2h-mix edition)
 
 import argparse
+import asyncio
+import hashlib
+import itertools
 import json
+import math
 import os
 import shlex
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
 from datetime import timedelta
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List
+
+try:
+    # ~2-3x faster on yt-dlp's small entry dicts, and takes the raw pipe bytes as-is
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj: Any, default=None) -> bytes:
+        return json.dumps(obj, default=default).encode("utf-8")
+
+try:
+    # In-process yt-dlp: extractors stay imported/warm instead of one interpreter start per call
+    import yt_dlp
+    from yt_dlp.utils import match_filter_func
+except ImportError:
+    yt_dlp = None
 
 DEF_SEEDS = [
     "top 2020 pop",
@@ -21,58 +43,506 @@ DEF_SEEDS = [
     "top 2010 pop",
 ]
 
-def run(cmd: str) -> subprocess.CompletedProcess:
-    """Run a shell command and return CompletedProcess with UTF-8 text."""
-    proc = subprocess.run(cmd, shell=True, capture_output=True)
+# Seconds before a seed search / Mix expansion is abandoned
+SEARCH_TIMEOUT = 120
+EXPAND_TIMEOUT = 600
+# Video ids per `yt-dlp -a -` process when probing through the binary
+PROBE_BATCH = 8
+# Per-line buffer for streamed NDJSON (one flat entry is a few KB)
+STREAM_LINE_LIMIT = 1 << 20
+
+# Seed lookups / Mix expansions are memoized here between runs (see --cache-ttl)
+CACHE_DIR = Path("cache/mix")
+# Probed durations/titles don't change, so those entries live longer
+PROBE_CACHE_TTL = 7 * 86400
+
+def cache_key(*parts: Any) -> str:
+    return hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).hexdigest()
+
+def cache_get(key: str, ttl: int) -> Any:
+    """Return the value stored under `key` if it is younger than `ttl` seconds, else None."""
+    if ttl <= 0:
+        return None
+    try:
+        entry = json_loads((CACHE_DIR / f"{key}.json").read_bytes())
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("ts", 0) >= ttl:
+        return None
+    return entry.get("value")
+
+def cache_put(key: str, value: Any) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = CACHE_DIR / f"{key}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(json_dumps({"ts": int(time.time()), "value": value}, default=str))
+    os.replace(tmp, path)  # atomic: a crashed run never leaves a torn entry
+
+def cache_prune(max_age: int) -> None:
+    """Drop cache entries that no TTL could still accept."""
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            for e in it:
+                if time.time() - e.stat().st_mtime >= max_age:
+                    os.unlink(e.path)
+    except OSError:
+        pass
+
+def cpus() -> int:
+    """CPUs this process may actually run on (respects cgroup/taskset affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on Windows/macOS
+        return os.cpu_count() or 1
+
+def run(argv: List[str]) -> subprocess.CompletedProcess:
+    """Run argv (no shell) and return CompletedProcess with UTF-8 text."""
+    try:
+        proc = subprocess.run(argv, capture_output=True)
+    except OSError as e:
+        return subprocess.CompletedProcess(argv, 127, "", str(e))
     proc.stdout = proc.stdout.decode("utf-8", errors="replace")
     proc.stderr = proc.stderr.decode("utf-8", errors="replace")
     return proc
 
-def get_seed_video_id(ytdlp: str, query: str, ytdlp_args: str) -> Optional[str]:
-    cmd = f'{shlex.quote(ytdlp)} {ytdlp_args} --get-id {shlex.quote(f"ytsearch1:{query}")}'.strip()
-    p = run(cmd)
+async def run_async(argv: List[str], timeout: float) -> subprocess.CompletedProcess:
+    """Run argv (no shell) without blocking the event loop; kill it after `timeout` seconds."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except OSError as e:
+        return subprocess.CompletedProcess(argv, 127, "", str(e))
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return subprocess.CompletedProcess(argv, -9, "", f"timed out after {timeout}s")
+    return subprocess.CompletedProcess(
+        argv, proc.returncode,
+        out.decode("utf-8", errors="replace"),
+        err.decode("utf-8", errors="replace"),
+    )
+
+_tls = threading.local()
+
+def api_ydl(ytdlp_args: List[str]) -> "yt_dlp.YoutubeDL":
+    """
+    Warm YoutubeDL for the calling thread, configured from the same extra CLI args
+    the binary would get. Instances aren't shared: YoutubeDL isn't thread-safe.
+    """
+    ydls = _tls.__dict__.setdefault("ydls", {})
+    key = tuple(ytdlp_args)
+    if key not in ydls:
+        opts = yt_dlp.parse_options(list(ytdlp_args)).ydl_opts
+        opts.update(quiet=True, no_warnings=True, noprogress=True, skip_download=True)
+        ydls[key] = yt_dlp.YoutubeDL(opts)
+    return ydls[key]
+
+def entry_filter(max_seconds: int, extra_filter: str) -> Callable[[Dict[str, Any]], bool]:
+    """
+    The Mix match-filter as a predicate built once, for the in-process path.
+    match_filter_func re-parses its string on every entry, so the fixed clauses
+    (!is_live & !was_live & duration <= max) are plain comparisons and only
+    --extra-filter goes through yt-dlp. Missing fields pass, as with --match-filter
+    on flat entries.
+    """
+    extra = match_filter_func(extra_filter) if extra_filter else None
+
+    def keep(obj: Dict[str, Any]) -> bool:
+        if obj.get("is_live") or obj.get("was_live"):
+            return False
+        dur = obj.get("duration")
+        if dur is not None and dur > max_seconds:
+            return False
+        # match_filter_func returns the rejection reason, None when it passes
+        return extra is None or extra(obj, incomplete=True) is None
+    return keep
+
+def api_seed_video_id(query: str, ytdlp_args: List[str]) -> Optional[str]:
+    info = api_ydl(ytdlp_args).extract_info(f"ytsearch1:{query}", download=False, process=False)
+    for entry in info.get("entries") or ():
+        return entry.get("id")
+    return None
+
+def api_expand_mix(seed_id: str, per_seed: int, keep: Callable[[Dict[str, Any]], bool], ytdlp_args: List[str],
+                   budget_seconds: int, stop: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+    ydl = api_ydl(ytdlp_args)
+    mix_url = f"https://www.youtube.com/watch?v={seed_id}&list=RD{seed_id}"
+    info = ydl.extract_info(mix_url, download=False, process=False)
+    # the watch?v=…&list=RD… URL hands off to the playlist extractor via a url result
+    for _ in range(3):
+        if info.get("_type") not in ("url", "url_transparent"):
+            break
+        info = ydl.extract_info(info["url"], download=False, process=False, ie_key=info.get("ie_key"))
+    items: List[Dict[str, Any]] = []
+    known = 0
+    # entries is a lazy generator: pages past the budget are never requested
+    for obj in itertools.islice(info.get("entries") or (), per_seed):
+        if stop is not None and stop.is_set():  # harvest no longer needs this seed
+            break
+        if obj.get("_type") not in (None, "url", "video") or not obj.get("id"):
+            continue
+        if not keep(obj):
+            continue
+        items.append(obj)
+        dur = obj.get("duration")
+        if isinstance(dur, (int, float)):
+            known += int(dur)
+            if known >= budget_seconds:
+                break
+    return items
+
+async def get_seed_video_id(ytdlp: Optional[str], query: str, ytdlp_args: List[str]) -> Optional[str]:
+    """`ytdlp=None` runs yt-dlp in-process, otherwise it's the binary to exec."""
+    if ytdlp is None:
+        try:
+            seed_id = await asyncio.to_thread(api_seed_video_id, query, ytdlp_args)
+        except Exception as e:
+            print(f"[!] Failed to get seed for: {query}\n{e}", file=sys.stderr)
+            return None
+        if not seed_id:
+            print(f"[!] Failed to get seed for: {query}", file=sys.stderr)
+        return seed_id
+    p = await run_async([ytdlp, *ytdlp_args, "--get-id", f"ytsearch1:{query}"], SEARCH_TIMEOUT)
     if p.returncode != 0 or not p.stdout.strip():
         print(f"[!] Failed to get seed for: {query}\n{p.stderr}", file=sys.stderr)
         return None
-    return p.stdout.strip().splitlines()[0]
+    # first line only; no need to split the rest
+    return p.stdout.lstrip().partition("\n")[0].strip()
 
-def expand_mix(ytdlp: str, seed_id: str, per_seed: int, match_filter: str, ytdlp_args: str) -> List[Dict[str, Any]]:
+async def expand_mix(ytdlp: Optional[str], seed_id: str, per_seed: int, match_filter: str,
+                     keep: Optional[Callable[[Dict[str, Any]], bool]],
+                     ytdlp_args: List[str], budget_seconds: int) -> List[Dict[str, Any]]:
+    """
+    Stream the Mix's NDJSON and parse each entry as yt-dlp prints it.
+    Once this seed alone covers `budget_seconds` of known durations, yt-dlp is
+    terminated: nothing past that point could ever make it into the playlist.
+    Cancelling the coroutine stops the expansion too.
+    """
+    if ytdlp is None:
+        stop = threading.Event()
+        try:
+            return await asyncio.to_thread(api_expand_mix, seed_id, per_seed, keep,
+                                           ytdlp_args, budget_seconds, stop)
+        except asyncio.CancelledError:
+            stop.set()  # the worker thread can't be cancelled, but it checks this per entry
+            raise
+        except Exception as e:
+            print(f"[!] yt-dlp error expanding mix for {seed_id}:\n{e}", file=sys.stderr)
+            return []
     mix_url = f"https://www.youtube.com/watch?v={seed_id}&list=RD{seed_id}"
-    cmd = (
-        f'{shlex.quote(ytdlp)} {ytdlp_args} --flat-playlist --playlist-end {per_seed} -j '
-        f'--match-filter {shlex.quote(match_filter)} {shlex.quote(mix_url)}'
-    ).strip()
-    p = run(cmd)
-    if p.returncode != 0:
-        print(f"[!] yt-dlp error expanding mix for {seed_id}:\n{p.stderr}", file=sys.stderr)
+    argv = [ytdlp, *ytdlp_args, "--flat-playlist", "--playlist-end", str(per_seed), "-j",
+            "--match-filter", match_filter, mix_url]
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            limit=STREAM_LINE_LIMIT,
+        )
+    except OSError as e:
+        print(f"[!] yt-dlp error expanding mix for {seed_id}:\n{e}", file=sys.stderr)
         return []
-    items = []
-    for line in p.stdout.splitlines():
-        try:
-            obj = json.loads(line)
+    # Drain stderr alongside stdout so a chatty yt-dlp never blocks on a full pipe
+    stderr_task = asyncio.create_task(proc.stderr.read())
+
+    items: List[Dict[str, Any]] = []
+
+    async def consume() -> bool:
+        known = 0
+        async for line in proc.stdout:
+            try:
+                obj = json_loads(line)
+            except json.JSONDecodeError:
+                continue
             # keep video-like things
-            if obj.get("_type") in (None, "url", "video"):
-                if obj.get("id"):
-                    items.append(obj)
-        except json.JSONDecodeError:
-            continue
+            if obj.get("_type") in (None, "url", "video") and obj.get("id"):
+                items.append(obj)
+                dur = obj.get("duration")
+                if isinstance(dur, (int, float)):
+                    known += int(dur)
+                    if known >= budget_seconds:
+                        return True
+        return False
+
+    timed_out = False
+    try:
+        enough = await asyncio.wait_for(consume(), EXPAND_TIMEOUT)
+    except asyncio.TimeoutError:
+        enough, timed_out = False, True
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            proc.terminate()
+        await proc.wait()  # reap it before the loop goes away
+        stderr_task.cancel()
+        raise
+    if (enough or timed_out) and proc.returncode is None:
+        proc.terminate()
+    rc = await proc.wait()
+    err = (await stderr_task).decode("utf-8", errors="replace")
+
+    if timed_out:
+        print(f"[!] yt-dlp timed out expanding mix for {seed_id} after {EXPAND_TIMEOUT}s", file=sys.stderr)
+        return []
+    if rc != 0 and not enough:
+        print(f"[!] yt-dlp error expanding mix for {seed_id}:\n{err}", file=sys.stderr)
+        return []
     return items
 
-def probe_info(ytdlp: str, video_id: str, probe_args: str) -> Optional[Dict[str, Any]]:
+async def harvest(ytdlp: Optional[str], seeds: List[str], per_seed: int, match_filter: str,
+                  keep: Optional[Callable[[Dict[str, Any]], bool]],
+                  ytdlp_args: List[str], target_seconds: int, max_seconds: int, cache_ttl: int,
+                  concurrency: int) -> List[List[Dict[str, Any]]]:
+    """
+    Search + expand every seed concurrently; results come back in seed order.
+    As soon as the leading seeds alone hold target_seconds of unique tracks that
+    need no probe, the walk in pick_tracks can't get past them, so the rest are
+    cancelled (their yt-dlp runs stopped) and come back empty.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    # Cached results are only valid for the yt-dlp build that produced them
+    version = ""
+    if cache_ttl > 0:
+        if ytdlp is None:
+            version = yt_dlp.version.__version__
+        else:
+            version = (await run_async([ytdlp, "--version"], SEARCH_TIMEOUT)).stdout.strip()
+    extra = " ".join(ytdlp_args)
+
+    async def process_seed(q: str) -> List[Dict[str, Any]]:
+        seed_key = cache_key("seed", q, extra, version)
+        seed_id = cache_get(seed_key, cache_ttl)
+        if not seed_id:
+            async with sem:
+                seed_id = await get_seed_video_id(ytdlp, q, ytdlp_args)
+            if not seed_id:
+                return []
+            if cache_ttl > 0:
+                cache_put(seed_key, seed_id)
+
+        mix_key = cache_key("mix", seed_id, per_seed, match_filter, target_seconds, extra, version)
+        items = cache_get(mix_key, cache_ttl)
+        if items is not None:
+            print(f"[*] {q} -> {seed_id} … {len(items)} cached entries")
+            return items
+        print(f"[*] {q} -> {seed_id} … expanding Mix")
+        async with sem:
+            items = await expand_mix(ytdlp, seed_id, per_seed, match_filter, keep, ytdlp_args, target_seconds)
+        print(f"    -> fetched {len(items)} entries from Mix for: {q}")
+        if items and cache_ttl > 0:
+            cache_put(mix_key, items)
+        return items
+
+    tasks = [asyncio.ensure_future(process_seed(q)) for q in seeds]
+    results: List[List[Dict[str, Any]]] = [[] for _ in seeds]
+    seen: set[str] = set()
+    covered = 0
+    try:
+        for i, task in enumerate(tasks):
+            results[i] = await task
+            for it in results[i]:
+                dur = it.get("duration")
+                if it.get("id") not in seen and isinstance(dur, (int, float)) and int(dur) <= max_seconds:
+                    covered += int(dur)
+                seen.add(it.get("id"))
+            if covered >= target_seconds:
+                if i + 1 < len(tasks):
+                    print(f"[i] Target covered by the first {i + 1} seed(s); skipping the other {len(tasks) - i - 1}")
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results
+
+def probe_info(ytdlp: Optional[str], video_id: str, probe_args: List[str]) -> Optional[Dict[str, Any]]:
     """
     Fetch full JSON for a single video to get reliable duration/title/uploader.
     Uses iOS client by default (can be overridden via probe_args).
     """
     url = f"https://www.youtube.com/watch?v={video_id}"
-    cmd = f'{shlex.quote(ytdlp)} -j --no-playlist {probe_args} {shlex.quote(url)}'
-    p = run(cmd)
+    if ytdlp is None:
+        try:
+            return api_ydl(probe_args).extract_info(url, download=False)
+        except Exception:
+            return None
+    p = run([ytdlp, "-j", "--no-playlist", *probe_args, url])
     if p.returncode != 0 or not p.stdout.strip():
         return None
     try:
-        return json.loads(p.stdout.strip().splitlines()[-1])
+        # the JSON is on the last line; slice it off without building a list of lines
+        return json_loads(p.stdout.rstrip().rpartition("\n")[2])
     except Exception:
         return None
 
+def probe_batch(ytdlp: Optional[str], video_ids: List[str], probe_args: List[str],
+                started: Optional[Callable[[subprocess.Popen], bool]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    probe_info for several videos, keyed by id (failed probes are simply absent).
+    Through the binary they all share one `yt-dlp -a -` process fed from stdin,
+    paying interpreter + extractor start-up once instead of per video.
+    `started(proc)` registers the process so the caller can terminate it; False aborts the batch.
+    """
+    if ytdlp is None:
+        return {vid: meta for vid in video_ids if (meta := probe_info(None, vid, probe_args))}
+    argv = [ytdlp, "-a", "-", "-j", "--no-playlist", "--no-abort-on-error", *probe_args]
+    try:
+        proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return {}
+    if started is not None and not started(proc):
+        proc.kill()
+        proc.wait()
+        return {}
+    proc.stdin.write("".join(f"https://www.youtube.com/watch?v={vid}\n" for vid in video_ids).encode("utf-8"))
+    proc.stdin.close()
+    metas: Dict[str, Dict[str, Any]] = {}
+    for line in proc.stdout:
+        try:
+            meta = json_loads(line)
+        except ValueError:
+            continue
+        if meta.get("id"):
+            metas[meta["id"]] = meta
+    proc.wait()
+    return metas
+
+async def pick_tracks(per_seed_items: List[List[Dict[str, Any]]], ytdlp: Optional[str], probe_args: List[str],
+                      max_seconds: int, probe_limit: int, target_seconds: int,
+                      concurrency: int, probe_ttl: int) -> tuple[List[tuple[str, str, str, int]], int, int]:
+    """
+    Walk the entries in seed order, keeping tracks <= max_seconds until target_seconds.
+    Entries with a missing/suspicious duration are probed (or answered from the probe
+    cache, see `probe_ttl`); ids up to `concurrency` places past the one being walked are
+    probed ahead, so order and the stop-at-target point are the same as serial.
+    Returns (rows, total seconds, probes used by the walk).
+    """
+    def needs_probe(it: Dict[str, Any]) -> bool:
+        dur = it.get("duration")
+        return not isinstance(dur, (int, float)) or int(dur) > max_seconds
+
+    candidates: List[Dict[str, Any]] = []
+    seen_ids: set[str] = set()
+    for items in per_seed_items:
+        for it in items:
+            vid = it.get("id")
+            if vid and vid not in seen_ids:
+                seen_ids.add(vid)
+                candidates.append(it)
+
+    # Earlier runs' probes answer without touching yt-dlp (and don't count against the limit)
+    known: Dict[str, Dict[str, Any]] = {}
+    if probe_ttl > 0:
+        for it in candidates:
+            if needs_probe(it) and (meta := cache_get(cache_key("probe", it["id"]), probe_ttl)):
+                known[it["id"]] = meta
+
+    # If we can't probe more, unknown/too-long entries past the limit are skipped
+    to_probe = [it["id"] for it in candidates if needs_probe(it) and it["id"] not in known][:probe_limit]
+    # In-process probes have no start-up cost to amortize, so keep them one per task
+    size = 1 if ytdlp is None else PROBE_BATCH
+    pos = {vid: i for i, vid in enumerate(to_probe)}
+    probe_of: Dict[str, asyncio.Future] = {}  # id -> the probe (batch) covering it
+    launched = 0  # ids of to_probe handed out so far
+    used = 0
+
+    # Cancelling a to_thread future doesn't stop its thread (and asyncio.run waits for it),
+    # so once the walk is done, batches not yet begun are skipped and running ones terminated
+    stop = threading.Event()
+    running: List[subprocess.Popen] = []
+    running_lock = threading.Lock()
+
+    def started(proc: subprocess.Popen) -> bool:
+        with running_lock:
+            if stop.is_set():
+                return False
+            running.append(proc)
+            return True
+
+    def probe_and_cache(batch: List[str]) -> Dict[str, Dict[str, Any]]:
+        if stop.is_set():
+            return {}
+        metas = probe_batch(ytdlp, batch, probe_args, started)
+        for vid, meta in metas.items():
+            if probe_ttl > 0 and isinstance(meta.get("duration"), (int, float)):
+                # only what we use; a full -j dump is hundreds of KB of formats
+                cache_put(cache_key("probe", vid),
+                          {k: meta.get(k) for k in ("id", "title", "uploader", "channel", "duration")})
+        return metas
+
+    def launch_until(n: int) -> None:
+        # the window is counted in ids, not batches: a batch never reaches past to_probe[n - 1]
+        nonlocal launched
+        n = min(n, len(to_probe))
+        while launched < n:
+            batch = to_probe[launched:min(launched + size, n)]
+            fut = asyncio.ensure_future(asyncio.to_thread(probe_and_cache, batch))
+            for b in batch:
+                probe_of[b] = fut
+            launched += len(batch)
+
+    rows: List[tuple[str, str, str, int]] = []  # (id, title, uploader, seconds)
+    total = 0
+    try:
+        for it in candidates:
+            vid = it["id"]
+            title = (it.get("title") or "").strip()
+            up = (it.get("uploader") or it.get("channel") or "").strip()
+
+            dur = it.get("duration")
+            # If duration is missing or suspicious, probe once
+            if needs_probe(it):
+                if vid in known:
+                    meta = known[vid]
+                elif vid in pos:
+                    launch_until(pos[vid] + concurrency)  # keep the window ahead of us full
+                    meta = (await probe_of[vid]).get(vid)
+                    used += 1
+                else:
+                    continue
+                if not meta or not isinstance(meta.get("duration"), (int, float)):
+                    # still no duration? skip to be safe
+                    continue
+                dur = int(meta["duration"])
+                # fill better metadata if we got it
+                title = (meta.get("title") or title).strip()
+                up = (meta.get("uploader") or meta.get("channel") or up).strip()
+
+            sec = int(dur)
+            if sec > max_seconds:
+                # too long, skip
+                continue
+
+            rows.append((vid, title, up, sec))
+            total += sec
+            if total >= target_seconds:
+                break
+    finally:
+        for fut in set(probe_of.values()):  # lookahead probes we no longer need
+            fut.cancel()
+        with running_lock:
+            stop.set()
+            for proc in running:
+                if proc.poll() is None:
+                    proc.terminate()
+    return rows, total, used
+
+def write_outputs(rows: List[tuple[str, str, str, int]], tsv_path: Path, urls_path: Path, m3u_path: Path) -> None:
+    """Write the TSV, URL list and M3U from one pass over rows; each file gets a single write()."""
+    tsv = ["video_id\ttitle\tuploader\tduration_seconds\turl\n"]
+    urls = []
+    m3u = ["#EXTM3U\n"]
+    for vid, title, up, sec in rows:
+        url = f"https://www.youtube.com/watch?v={vid}"
+        tsv.append(f"{vid}\t{title}\t{up}\t{sec}\t{url}\n")
+        urls.append(f"{url}\n")
+        m3u.append(f"#EXTINF:{sec},{up} - {title}\n{url}\n")
+
+    tsv_path.write_text("".join(tsv), encoding="utf-8")
+    urls_path.write_text("".join(urls), encoding="utf-8")
+    m3u_path.write_text("".join(m3u), encoding="utf-8")
+
 def human_time(seconds: int) -> str:
     return str(timedelta(seconds=seconds))
 
@@ -81,7 +551,10 @@ def main():
         description="Siphon huge YouTube playlists from auto-generated Mixes.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
-    ap.add_argument("--ytdlp", default="yt-dlp", help="Path to yt-dlp binary")
+    ap.add_argument("--ytdlp", default="yt-dlp",
+                    help="Path to yt-dlp binary (only used without the yt_dlp module, or with --subprocess)")
+    ap.add_argument("--subprocess", action="store_true",
+                    help="Exec the --ytdlp binary per call even when the yt_dlp module is importable")
 
     # Extra args passthroughs
     ap.add_argument("--ytdlp-arg", action="append", default=[],
@@ -104,16 +577,22 @@ def main():
     ap.add_argument("--mpv", default="mpv", help="Path to mpv binary")
     ap.add_argument("--no-shuffle", action="store_true", help="Don’t shuffle when playing")
     ap.add_argument("--extra-filter", default="", help="Extra yt-dlp match-filter expression")
+    ap.add_argument("--concurrency", type=int, default=min(8, 2 * cpus()),
+                    help="Max yt-dlp processes running at once")
+    ap.add_argument("--cache-ttl", type=int, default=86400,
+                    help=f"Reuse seed lookups / Mix expansions cached in {CACHE_DIR} for this many seconds (0=off)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help=f"Neither read nor write {CACHE_DIR} (seed/Mix results and {PROBE_CACHE_TTL // 86400}-day probe cache)")
     args = ap.parse_args()
 
-    # Build ytdlp args strings (for shell safety)
-    ytdlp_extra = " ".join(shlex.quote(a) for a in (args.ytdlp_arg or []))
+    # Extra yt-dlp args as an argv list, parsed once (yt-dlp is never run through a shell)
+    ytdlp_extra: List[str] = list(args.ytdlp_arg or [])
     if args.ytdlp_args:
-        ytdlp_extra = f"{ytdlp_extra} {args.ytdlp_args}".strip()
+        ytdlp_extra += shlex.split(args.ytdlp_args)
 
     # Good: plain web client, no tokens needed
     default_probe = "--extractor-args youtube:player_client=web --force-ipv4 --concurrent-fragments 1 --http-chunk-size 10M"
-    probe_args = f"{ytdlp_extra} {default_probe}".strip()
+    probe_args = ytdlp_extra + shlex.split(default_probe)
 
 
     seeds: List[str] = []
@@ -138,65 +617,36 @@ def main():
     avg_seconds = max(60, args.avg_seconds)
     max_seconds = max(60, args.max_seconds)
     probe_limit = max(0, args.probe_limit)
+    # A single seed never needs more than ~target/avg entries (+30% slack for dupes and
+    # rejects), so don't have yt-dlp page through the rest of a 600-entry Mix.
+    per_seed = max(1, min(args.per_seed, math.ceil(target_seconds / avg_seconds * 1.3)))
+
+    # None = in-process yt_dlp module; otherwise the binary to exec
+    ytdlp = None if (yt_dlp is not None and not args.subprocess) else args.ytdlp
+    # the binary gets the string above; in-process, the same filter as a compiled predicate
+    keep = entry_filter(max(1, args.max_seconds), args.extra_filter.strip()) if ytdlp is None else None
 
+    print(f"[i] yt-dlp: {'in-process ' + yt_dlp.version.__version__ if ytdlp is None else ytdlp}")
     print(f"[i] Seeds: {seeds}")
     print(f"[i] Target: {args.target_hours}h ≈ {target_seconds} sec")
-    print(f"[i] Per-seed limit: {args.per_seed}")
+    print(f"[i] Per-seed limit: {per_seed} (of --per-seed {args.per_seed})")
     print(f"[i] Match-filter: {match_filter}")
     print(f"[i] Max seconds per track: {max_seconds} (probes up to {probe_limit})")
 
-    seen_ids: set[str] = set()
-    rows: List[tuple[str, str, str, int]] = []  # (id, title, uploader, seconds)
-    total = 0
-    probes_used = 0
-
-    # Harvest
-    for q in seeds:
-        print(f"[*] Getting seed for: {q}")
-        seed_id = get_seed_video_id(args.ytdlp, q, ytdlp_extra)
-        if not seed_id:
-            continue
-        print(f"    -> {seed_id} … expanding Mix")
-        items = expand_mix(args.ytdlp, seed_id, args.per_seed, match_filter, ytdlp_extra)
-        print(f"    -> fetched {len(items)} entries from Mix")
-
-        for it in items:
-            vid = it.get("id")
-            if not vid or vid in seen_ids:
-                continue
+    cache_ttl = 0 if args.no_cache else args.cache_ttl
+    probe_ttl = 0 if args.no_cache else PROBE_CACHE_TTL
+    if not args.no_cache:
+        cache_prune(max(cache_ttl, probe_ttl))
 
-            title = (it.get("title") or "").strip()
-            up = (it.get("uploader") or it.get("channel") or "").strip()
-
-            dur = it.get("duration")
-            # If duration is missing or suspicious, probe once
-            if not isinstance(dur, (int, float)) or int(dur) > max_seconds:
-                if probes_used >= probe_limit:
-                    # If we can't probe more, skip unknown/too-long entries
-                    continue
-                meta = probe_info(args.ytdlp, vid, probe_args)
-                probes_used += 1
-                if not meta or not isinstance(meta.get("duration"), (int, float)):
-                    # still no duration? skip to be safe
-                    continue
-                dur = int(meta["duration"])
-                # fill better metadata if we got it
-                title = (meta.get("title") or title).strip()
-                up = (meta.get("uploader") or meta.get("channel") or up).strip()
-
-            sec = int(dur)
-            if sec > max_seconds:
-                # too long, skip
-                continue
-
-            rows.append((vid, title, up, sec))
-            seen_ids.add(vid)
-            total += sec
-
-            if total >= target_seconds:
-                break
-        if total >= target_seconds:
-            break
+    # Harvest: all seeds in parallel, then walk the results in seed order
+    concurrency = max(1, args.concurrency)
+    print(f"[*] Expanding {len(seeds)} seed(s), up to {concurrency} at a time")
+    per_seed_items = asyncio.run(
+        harvest(ytdlp, seeds, per_seed, match_filter, keep, ytdlp_extra, target_seconds, max_seconds, cache_ttl, concurrency)
+    )
+    rows, total, probes_used = asyncio.run(
+        pick_tracks(per_seed_items, ytdlp, probe_args, max_seconds, probe_limit, target_seconds, concurrency, probe_ttl)
+    )
 
     if not rows:
         print("[!] No results (everything too long or probing failed). "
@@ -210,24 +660,7 @@ def main():
     urls_path = Path("urls.txt") if prefix.name == "mix" else Path(f"{prefix.name}_urls.txt")
     m3u_path = prefix.with_suffix(".m3u")
 
-    # Write TSV
-    with tsv_path.open("w", encoding="utf-8") as f:
-        f.write("video_id\ttitle\tuploader\tduration_seconds\turl\n")
-        for vid, title, up, sec in rows:
-            url = f"https://www.youtube.com/watch?v={vid}"
-            f.write(f"{vid}\t{title}\t{up}\t{sec}\t{url}\n")
-
-    # Write URL list
-    with urls_path.open("w", encoding="utf-8") as f:
-        for vid, _, _, _ in rows:
-            f.write(f"https://www.youtube.com/watch?v={vid}\n")
-
-    # Write M3U
-    with m3u_path.open("w", encoding="utf-8") as f:
-        f.write("#EXTM3U\n")
-        for vid, title, up, sec in rows:
-            f.write(f"#EXTINF:{sec},{up} - {title}\n")
-            f.write(f"https://www.youtube.com/watch?v={vid}\n")
+    write_outputs(rows, tsv_path, urls_path, m3u_path)
 
     print(f"[✓] Wrote: {tsv_path}")
     print(f"[✓] Wrote: {urls_path}")
@@ -235,15 +668,20 @@ def main():
     print(f"[✓] Tracks: {len(rows)} | Total ~ {human_time(total)} | Probes used: {probes_used}")
 
     if args.play:
-        shuffle = "" if args.no_shuffle else "--shuffle"
         # NOTE: mpv streaming from YT is optional; you’re downloading elsewhere anyway.
-        cmd = (
-            f'{shlex.quote(args.mpv)} --no-video '
-            f'--ytdl-raw-options=match-filter="{match_filter}" '
-            f'--loop-playlist=inf {shuffle} --playlist={shlex.quote(str(urls_path))}'
-        )
-        print(f"[*] Launching mpv:\n{cmd}")
-        os.system(cmd)
+        argv = [
+            args.mpv, "--no-video",
+            f"--ytdl-raw-options=match-filter={match_filter}",
+            "--loop-playlist=inf",
+            *([] if args.no_shuffle else ["--shuffle"]),
+            f"--playlist={urls_path}",
+        ]
+        print(f"[*] Launching mpv:\n{shlex.join(argv)}")
+        try:
+            sys.exit(subprocess.run(argv, check=False).returncode)
+        except OSError as e:
+            print(f"[!] Could not start mpv: {e}", file=sys.stderr)
+            sys.exit(127)
 
 if __name__ == "__main__":
     main()
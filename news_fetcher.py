@@ -1,59 +1,173 @@
 #!/usr/bin/env python3
-import os, time, json, feedparser, requests
+import os, time, json, asyncio, feedparser, requests
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
+try:
+    import aiohttp  # all feeds on one event loop; thread pool over requests otherwise
+except ImportError:
+    aiohttp = None
+
+try:
+    import orjson  # much faster dumps/loads of the cache file; stdlib json otherwise
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
 CACHE = Path("cache/news.json")
 FEEDS = [u.strip() for u in os.getenv("NEWS_FEEDS", "").split(";") if u.strip()]
 MAX_ITEMS = 30
 TTL_SECONDS = 15 * 60  # refresh every 15 minutes
+MAX_PARALLEL = 16
+SEEN_IDS_MAX = 500  # entry ids remembered per feed
+
+# Keep-alive pool shared by all feed fetches (feedparser.parse(url) opens a fresh connection each time)
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = feedparser.USER_AGENT
+for _scheme in ("https://", "http://"):
+    SESSION.mount(_scheme, HTTPAdapter(pool_connections=MAX_PARALLEL, pool_maxsize=MAX_PARALLEL))
+
+def validators(prev):
+    # conditional GET headers from the previous run's response
+    headers = {}
+    if prev.get("etag"):
+        headers["If-None-Match"] = prev["etag"]
+    if prev.get("last_modified"):
+        headers["If-Modified-Since"] = prev["last_modified"]
+    return headers
 
-def fetch_all():
+def parse_feed(content, resp_headers, prev):
+    """
+    Response body + headers -> {"etag", "last_modified", "items", "seen_ids"}.
+    Entries whose id/guid (or link) an earlier run already took are skipped; only
+    new ones are built and put in front of the previous items.
+    """
+    # hand feedparser the headers too, so it still sees the declared charset
+    d = feedparser.parse(content, response_headers={k.lower(): v for k, v in resp_headers.items()})
+    source = (d.get("feed", {}).get("title") or "").strip()[:80]
+    seen = set(prev.get("seen_ids") or ())
+    new_ids = []
     items = []
-    seen = set()
-    for url in FEEDS:
+    for e in d.entries[:15]:
+        eid = e.get("id") or e.get("link")
+        if not eid or eid in seen:
+            continue
+        new_ids.append(eid)
+        title = (e.get("title") or "").strip()
+        link = (e.get("link") or "").strip()
+        if title and link:
+            items.append({"title": title, "link": link, "source": source})
+    return {
+        "etag": resp_headers.get("ETag"),
+        "last_modified": resp_headers.get("Last-Modified"),
+        # (state from before seen_ids existed: its items are all re-seen above, don't carry them)
+        "items": (items + (prev.get("items") or [] if "seen_ids" in prev else []))[:15],
+        "seen_ids": (new_ids + (prev.get("seen_ids") or []))[:SEEN_IDS_MAX],
+    }
+
+def fetch_feed(url, prev):
+    """
+    Fetch one feed. Sends the validators from the previous run, and on
+    304 Not Modified reuses its items without a body or parse.
+    """
+    r = SESSION.get(url, headers=validators(prev), timeout=10)
+    if r.status_code == 304 and "items" in prev:
+        return prev
+    r.raise_for_status()
+    return parse_feed(r.content, r.headers, prev)
+
+async def fetch_feed_async(session, url, prev):
+    """fetch_feed over a shared aiohttp session."""
+    async with session.get(url, headers=validators(prev)) as r:
+        if r.status == 304 and "items" in prev:
+            return prev
+        r.raise_for_status()
+        content = await r.read()
+    return parse_feed(content, r.headers, prev)
+
+async def fetch_feeds_async(prev_feeds):
+    connector = aiohttp.TCPConnector(limit=MAX_PARALLEL, limit_per_host=2, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector,
+                                     headers={"User-Agent": feedparser.USER_AGENT},
+                                     # per-socket like requests' timeout=10: a `total` would also
+                                     # count time queued behind limit_per_host and drop slow hosts' feeds
+                                     timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=10)) as session:
+        return await asyncio.gather(
+            *(fetch_feed_async(session, url, prev_feeds.get(url) or {}) for url in FEEDS),
+            return_exceptions=True,
+        )
+
+def fetch_feeds_threaded(prev_feeds):
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL, len(FEEDS)))) as ex:
+        futs = [ex.submit(fetch_feed, url, prev_feeds.get(url) or {}) for url in FEEDS]
+    for fut in futs:
         try:
-            d = feedparser.parse(url)
-            for e in d.entries[:15]:
-                title = (e.get("title") or "").strip()
-                link = (e.get("link") or "").strip()
-                if not title or not link: 
-                    continue
-                key = (title, link)
-                if key in seen: 
-                    continue
-                seen.add(key)
-                items.append({
-                    "title": title,
-                    "link": link,
-                    "source": (d.get("feed", {}).get("title") or "").strip()[:80],
-                })
-        except Exception as ex:
-            print(f"[news] feed error {url}: {ex}")
+            results.append(fut.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
+def fetch_all(prev_feeds=None):
+    """Returns (merged items, per-feed state to persist for the next conditional GET)."""
+    prev_feeds = prev_feeds or {}
+    items = []
+    seen = set()
+    feeds = {}
+    # fetch every feed at once; results are still merged in FEEDS order
+    if aiohttp is not None and FEEDS:
+        results = asyncio.run(fetch_feeds_async(prev_feeds))
+    else:
+        results = fetch_feeds_threaded(prev_feeds)
+    for url, res in zip(FEEDS, results):
+        if isinstance(res, BaseException):
+            # timeouts stringify to "", so fall back to the exception name
+            print(f"[news] feed error {url}: {str(res) or type(res).__name__}")
+            continue
+        feeds[url] = res
+        for it in res["items"]:
+            key = (it["title"], it["link"])
+            if key in seen: 
+                continue
+            seen.add(key)
+            items.append(it)
     # Dedup and cap
-    return items[:MAX_ITEMS]
+    return items[:MAX_ITEMS], feeds
+
+def load_json(raw: bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def dump_json(obj) -> bytes:
+    # both pretty-print with 2 spaces and keep non-ASCII as UTF-8
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
 
 def main():
     CACHE.parent.mkdir(parents=True, exist_ok=True)
+    prev_feeds = {}
     if CACHE.exists():
         try:
-            data = json.loads(CACHE.read_text(encoding="utf-8"))
+            data = load_json(CACHE.read_bytes())
             ts = data.get("_fetched_ts", 0)
             if time.time() - ts < TTL_SECONDS and data.get("items"):
                 print("[news] cache fresh; nothing to do.")
                 return
+            prev_feeds = data.get("feeds") or {}
         except Exception:
             pass
-    items = fetch_all()
+    items, feeds = fetch_all(prev_feeds)
     out = {
         "_fetched_ts": int(time.time()),
         "_fetched_at": datetime.now(timezone.utc).isoformat(),
-        "items": items
+        "items": items,
+        "feeds": feeds,
     }
-    CACHE.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+    CACHE.write_bytes(dump_json(out))
     print(f"[news] saved {len(items)} items to {CACHE}")
 
 if __name__ == "__main__":
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # Orchestrator: plays [HOST TTS] -> [SONG], jingle every N tracks, rolling delete.
-import os, re, json, random, argparse, subprocess, time
+import os, re, json, random, argparse, subprocess, time, atexit, socket
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -13,14 +13,20 @@ import subprocess
 def run(cmd):
     return subprocess.run(cmd, capture_output=True, text=True)
 
-def mpv_play(path:Path)->int:
+MPV_ARGS = ["--no-video","--really-quiet"]
+
+def mpv_play(path:Path, player=None)->int:
     # Press 'q' to skip current and continue
-    return subprocess.call(["mpv","--no-video","--really-quiet",str(path)])
+    if player is not None:
+        return player.play(path)
+    return subprocess.call(["mpv", *MPV_ARGS, str(path)])
 
-def ytdlp_download_direct(ytdlp, url, cachedir, extra_args=""):
+def ytdlp_download_direct(ytdlp, url, cachedir, extra_args="", fragments=4):
     cachedir.mkdir(parents=True, exist_ok=True)
     template = str(cachedir / "%(title).200s [%(id)s].%(ext)s")
-    cmd = [ytdlp, "--no-playlist", "-f","bestaudio/best","-o",template,"--no-part","--print","after_move:filepath", url]
+    cmd = [ytdlp, "--no-playlist", "-f","bestaudio/best","-o",template,"--no-part",
+           "--concurrent-fragments", str(max(1, fragments)),
+           "--print","after_move:filepath", url]
     if extra_args:
         import shlex; cmd += shlex.split(extra_args)
     p = run(cmd)
@@ -37,7 +43,8 @@ def ytdlp_download_direct(ytdlp, url, cachedir, extra_args=""):
 
 # --- load workers ---
 from host_worker import craft_host_text
-from tts_worker import tts_to_file
+from tts_worker import tts_to_file, warm_up as tts_warm_up
+from radio_runner import find_audio, jingle_picker, read_url_lines, MpvIPC
 
 # --- main ---
 def parse_title_artist(title:str):
@@ -67,33 +74,52 @@ def main():
     ap.add_argument("--jingle-period", type=int, default=2, help="Play a random jingle every N songs (0=off)")
     ap.add_argument("--ytdlp", default="yt-dlp", help="Path to yt-dlp")
     ap.add_argument("--ytdlp-args", default="", help="Extra args for yt-dlp (quoted)")
+    ap.add_argument("--concurrent-fragments", type=int, default=4,
+                    help="Fragments yt-dlp fetches in parallel on HLS/DASH formats (default 4)")
     ap.add_argument("--shuffle", action="store_true", help="Shuffle once at start")
+    ap.add_argument("--seed", type=int, default=None, help="Seed for --shuffle (reproducible order)")
     ap.add_argument("--no-delete", action="store_true", help="Keep downloaded songs (debug)")
+    ap.add_argument("--no-mpv-ipc", action="store_true", help="New mpv per clip instead of one persistent mpv over IPC")
     args = ap.parse_args()
 
     urls_path = Path(args.urls)
     if not urls_path.exists():
         print(f"[!] Missing {urls_path}"); return
 
-    urls = [ln.strip() for ln in urls_path.read_text(encoding="utf-8").splitlines() if ln.strip()]
+    lines = read_url_lines(urls_path)
+    urls = list(dict.fromkeys(lines))  # drop repeats, keep first-seen order
+    if len(urls) < len(lines):
+        print(f"[i] Deduped {len(lines) - len(urls)} duplicate URL(s)")
     if args.shuffle:
-        random.shuffle(urls)
+        seed = args.seed if args.seed is not None else random.randrange(2**32)
+        random.Random(seed).shuffle(urls)
+        print(f"[i] Shuffled with --seed {seed}")
 
     jingles = []
     jroot = Path(args.jingles_dir)
     if args.jingle_period>0 and jroot.exists():
-        jingles = [p for p in jroot.rglob("*") if p.suffix.lower() in (".mp3",".m4a",".wav",".flac")]
+        jingles = find_audio(jroot)
         print(f"[i] Loaded {len(jingles)} jingles.")
+    picks = jingle_picker(jingles) if jingles else None
     headlines = load_headlines()
 
     cachedir = Path(args.cache_dir); cachedir.mkdir(parents=True, exist_ok=True)
 
+    # One mpv for host/song/jingle clips alike (Unix sockets only; per-clip mpv otherwise)
+    player = None
+    if not args.no_mpv_ipc and hasattr(socket, "AF_UNIX"):
+        player = MpvIPC("mpv", MPV_ARGS)
+        atexit.register(player.close)
+
+    # Connect to the TTS API while the first track downloads
+    tts_warm_up()
+
     prev_song = None
     count = 0
 
     for url in urls:
         # 1) Download next track
-        song_path = ytdlp_download_direct(args.ytdlp, url, cachedir, args.ytdlp_args)
+        song_path = ytdlp_download_direct(args.ytdlp, url, cachedir, args.ytdlp_args, args.concurrent_fragments)
         if song_path is None:
             continue
 
@@ -113,22 +139,29 @@ def main():
 
         # 3) Play HOST, then SONG
         print(f"[HOST] {host_text}")
-        mpv_play(tts_file)
-        print(f"[SONG] {raw_title}")
-        rc = mpv_play(song_path)
+        if player is not None:
+            # both queued in the one mpv: the song follows the host without a reload gap
+            print(f"[SONG] {raw_title}")
+            rc = player.play(tts_file, song_path)
+        else:
+            mpv_play(tts_file)
+            print(f"[SONG] {raw_title}")
+            rc = mpv_play(song_path)
         count += 1
 
         # 4) Jingle every N songs
         if args.jingle_period>0 and (count % args.jingle_period == 0) and jingles:
-            j = random.choice(jingles)
+            j = next(picks)
             print(f"[♪] JINGLE: {j.name}")
-            mpv_play(j)
+            mpv_play(j, player)
 
         # 5) Rolling delete
-        if not args.no_delete and prev_song and prev_song.exists():
+        if not args.no_delete and prev_song:
             try:
                 prev_song.unlink()
                 print(f"[x] Deleted previous: {prev_song.name}")
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 print(f"[!] Could not delete {prev_song}: {e}")
         prev_song = song_path
@@ -17,28 +17,129 @@
 
 import argparse
 import concurrent.futures as cf
+import json
+import mmap
+import os
+import queue
 import random
+from collections import deque
+from functools import partial
 import re
+import shutil
 import signal
+import socket
 import subprocess
 import sys
 import shlex
+import tempfile
+import threading
 import time
 from pathlib import Path
-from typing import Optional, List
+from typing import Callable, Dict, Optional, List, Tuple
+
+try:
+    import re2 as _re  # google-re2: no backtracking, same compile/search API
+except ImportError:
+    _re = re
+
+try:
+    import yt_dlp  # downloads run in-process when available (see --subprocess)
+except ImportError:
+    yt_dlp = None
 
 YTDLP_DEFAULT = "yt-dlp"
 MPV_DEFAULT = "mpv"
 
-# Accepts v=, youtu.be/, shorts/
-YOUTUBE_ID_RE = re.compile(r"(?:[?&]v=|youtu\.be/|youtube\.com/shorts/)([A-Za-z0-9_\-]{8,})")
+# Retry delay between download strategies: uniform(0, min(MAX, BASE * 1.5**attempt))
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 8.0
+
+# How often a playing track checks for a stop request
+POLL_SECONDS = 0.25
+
+# Accepts v=, youtu.be/, shorts/ (linear-time RE2 engine when google-re2 is installed)
+YOUTUBE_ID_RE = _re.compile(r"(?:[?&]v=|youtu\.be/|youtube\.com/shorts/)([A-Za-z0-9_\-]{8,})")
+
+AUDIO_EXTS = frozenset({".mp3", ".m4a", ".wav", ".flac"})
 
 def log(msg: str, quiet: bool = False):
     if not quiet:
-        print(msg, flush=True)
+        # one write per line: download threads log concurrently
+        print(msg + "\n", end="", flush=True)
 
 def run(cmd: List[str]) -> subprocess.CompletedProcess:
-    return subprocess.run(cmd, capture_output=True, text=True)
+    # raw bytes: the output is only decoded where it's actually used
+    return subprocess.run(cmd, capture_output=True)
+
+def walk_audio(root):
+    # straight scandir recursion: DirEntry carries the type, so no per-entry stat or
+    # name re-joining as with os.walk; only matching names ever become Path objects
+    with os.scandir(root) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False):
+                yield from walk_audio(e.path)
+            elif e.name[e.name.rfind("."):].lower() in AUDIO_EXTS:
+                yield Path(e.path)
+
+def find_audio(root: Path) -> List[Path]:
+    return list(walk_audio(root))
+
+def jingle_picker(jingles: List[Path], avoid: int = 8):
+    """
+    Endless random jingles where none of the last `avoid` picks (fewer for a small
+    pool) can come up again. Paths and weights are parallel lists built once; a pick
+    zeroes its weight and the pick falling out of the recent window restores it.
+    """
+    idx = range(len(jingles))
+    weights = [1.0] * len(jingles)
+    recent: deque = deque(maxlen=min(avoid, len(jingles) - 1))
+    while True:
+        i = random.choices(idx, weights=weights)[0]
+        yield jingles[i]
+        if recent.maxlen:
+            if len(recent) == recent.maxlen:
+                weights[recent[0]] = 1.0
+            recent.append(i)
+            weights[i] = 0.0
+
+def _safe_unlink(p: Path, quiet: bool) -> None:
+    try:
+        p.unlink()
+        log(f"[x] Deleted previous: {p.name}", quiet)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log(f"[!] Could not delete {p}: {e}", quiet)
+
+def drop_page_cache(p: Path) -> None:
+    """Hint the kernel that a played file's pages needn't stay cached (no-op off POSIX)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(p, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def read_url_lines(path: Path) -> List[str]:
+    """Non-blank, stripped lines of a URL list, read through mmap so only kept lines get decoded."""
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file: nothing to map
+            return []
+        with mm:
+            # bytes.isspace() cheaply drops ASCII-blank lines (readline never yields b"" before
+            # EOF). The rest are decoded and re-split with str.splitlines(), like read_text() did:
+            # readline only splits on \n, not lone \r, \x0c, U+2028 etc.; the str strip also
+            # drops Unicode-only blanks like U+00A0
+            return [u for ln in iter(mm.readline, b"") if not ln.isspace()
+                    for part in ln.decode("utf-8").splitlines() if (u := part.strip())]
 
 def parse_id(url: str) -> Optional[str]:
     m = YOUTUBE_ID_RE.search(url)
@@ -62,58 +163,314 @@ def build_mpv_base_args(quiet: bool) -> List[str]:
         base.append("--really-quiet")
     return base
 
-def mpv_play(mpv_path: str, fpath: Path, mpv_extra: List[str], quiet: bool = False) -> int:
+class MpvIPC:
+    """
+    One long-lived `mpv --idle` driven over its JSON IPC socket, so tracks don't each
+    pay mpv start-up and an audio device reopen. play() queues its files back to back
+    and blocks until the last one ends, like a per-track mpv did; 'q' is rebound to
+    skip to the next queued file instead of quitting mpv.
+    """
+
+    def __init__(self, mpv_path: str, mpv_args: List[str]):
+        self.mpv_path = mpv_path
+        self.mpv_args = mpv_args
+        self.tmpdir = tempfile.mkdtemp(prefix="radio-mpv-")
+        self.sock_path = os.path.join(self.tmpdir, "ipc.sock")
+        self.input_conf = os.path.join(self.tmpdir, "input.conf")
+        with open(self.input_conf, "w", encoding="utf-8") as f:
+            f.write("q playlist-next force\nQ playlist-next force\n")
+        self.proc: Optional[subprocess.Popen] = None
+        self.sock: Optional[socket.socket] = None
+        self.buf = b""
+
+    def _start(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+        self.proc = subprocess.Popen([self.mpv_path, *self.mpv_args, "--idle=yes",
+                                      f"--input-conf={self.input_conf}",
+                                      f"--input-ipc-server={self.sock_path}"])
+        deadline = time.monotonic() + 10
+        while True:
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                s.connect(self.sock_path)
+                break
+            except OSError:
+                s.close()
+                if self.proc.poll() is not None or time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        s.settimeout(POLL_SECONDS)  # so play() can notice a stop request mid-track
+        self.sock = s
+        self.buf = b""
+
+    def command(self, *cmd) -> None:
+        self.sock.sendall(json.dumps({"command": list(cmd)}).encode("utf-8") + b"\n")
+
+    def _messages(self, should_stop: Callable[[], bool]):
+        # IPC messages as they arrive; ends when mpv closes the socket or should_stop() is true
+        while True:
+            while b"\n" in self.buf:
+                line, self.buf = self.buf.split(b"\n", 1)
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    pass
+            if should_stop():
+                return
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:  # reset by a dying mpv
+                return
+            if not data:
+                return
+            self.buf += data
+
+    def play(self, *fpaths: Path, should_stop: Callable[[], bool] = lambda: False) -> int:
+        if self.proc is None or self.proc.poll() is not None:
+            self._start()  # first use, or mpv went away (crash / Ctrl+C)
+        for i, fpath in enumerate(fpaths):
+            self.command("loadfile", str(fpath), "append" if i else "replace")
+        started, ended, rc = False, 0, 0
+        for msg in self._messages(should_stop):
+            if msg.get("event") == "start-file":
+                started = True
+            elif msg.get("event") == "end-file" and started:
+                if msg.get("reason") == "error":
+                    rc = 2
+                ended += 1
+                if ended == len(fpaths):
+                    return rc
+        if self.proc.poll() is None:
+            # asked to stop: end playback now, keep mpv around for close()
+            try:
+                self.command("stop")
+                return 4
+            except OSError:
+                pass  # a terminal Ctrl-C reached mpv too: socket gone, process on its way out
+        # socket closed: mpv itself exited
+        return self.proc.wait()
+
+    def close(self) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            try:
+                self.command("quit")
+                self.proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.proc.kill()
+        if self.sock is not None:
+            self.sock.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+def mpv_play(mpv_path: str, fpath: Path, mpv_extra: List[str], quiet: bool = False,
+             player: Optional[MpvIPC] = None,
+             should_stop: Callable[[], bool] = lambda: False) -> int:
+    """Play one file to the end; polled, so should_stop() cuts it short within POLL_SECONDS."""
     log(f"[►] Playing: {fpath.name}", quiet)
+    if player is not None:
+        return player.play(fpath, should_stop=should_stop)
     cmd = [mpv_path] + build_mpv_base_args(quiet) + mpv_extra + [str(fpath)]
-    return subprocess.call(cmd)
-
-def build_ytdlp_cmd_base(ytdlp: str, template: str, direct: bool,
-                         audio_format: str, audio_quality: str) -> List[str]:
+    proc = subprocess.Popen(cmd)
+    while True:
+        try:
+            return proc.wait(timeout=POLL_SECONDS)
+        except subprocess.TimeoutExpired:
+            if should_stop():
+                proc.terminate()
+                return proc.wait()
+
+def build_ytdlp_cmd_base(ytdlp: Optional[str], template: str, direct: bool,
+                         audio_format: str, audio_quality: str, fragments: int = 4) -> List[str]:
+    # ytdlp=None: bare options for the in-process YoutubeDL (path comes from the info dict)
+    head = [ytdlp] if ytdlp else []
+    tail = ["--print", "after_move:filepath"] if ytdlp else []
+    # parallel segment fetches for HLS/DASH formats (parse_options maps it for the API too);
+    # a stalled googlevideo connection errors out (and gets retried) after 10s, not yt-dlp's 20s
+    tail = ["--concurrent-fragments", str(max(1, fragments)), "--socket-timeout", "10"] + tail
     if direct:
-        return [
-            ytdlp, "--no-playlist",
+        return head + [
+            "--no-playlist",
             "-f", "bestaudio/best",
             "-o", template,
             "--no-part",
-            "--print", "after_move:filepath",
-        ]
+        ] + tail
     else:
-        return [
-            ytdlp, "--no-playlist",
+        return head + [
+            "--no-playlist",
             "-x", "--audio-format", audio_format, "--audio-quality", audio_quality,
             "-o", template,
             "--no-part",
-            "--print", "after_move:filepath",
-        ]
+        ] + tail
 
 def try_ytdlp_once(cmd: List[str], url: str, quiet: bool) -> Optional[Path]:
     p = run(cmd + [url])
     if p.returncode != 0:
-        log(f"[!] yt-dlp failed: {url}\nSTDERR:\n{p.stderr}\nSTDOUT:\n{p.stdout}", quiet)
+        err, out = p.stderr.decode(errors="replace"), p.stdout.decode(errors="replace")
+        log(f"[!] yt-dlp failed: {url}\nSTDERR:\n{err}\nSTDOUT:\n{out}", quiet)
         return None
-    path = p.stdout.strip().splitlines()[-1] if p.stdout.strip() else ""
+    # only the last line (--print after_move:filepath) matters
+    path = p.stdout.rstrip().rpartition(b"\n")[2].strip()
     if not path:
         log(f"[!] yt-dlp gave no filepath for {url}", quiet)
         return None
-    out = Path(path)
+    out = Path(os.fsdecode(path))
     if not out.exists():
         log(f"[!] Download reported but file missing: {out}", quiet)
         return None
     return out
 
-def ytdlp_download_smart(ytdlp: str, url: str, cachedir: Path,
+# Warm YoutubeDLs per download thread, one per option set (each fallback strategy
+# gets its own), reused for every track. Not shared across threads: YoutubeDL isn't reentrant.
+# Each one keeps its own pooled keep-alive HTTP session (yt-dlp's requests handler, since
+# requests is installed), so later tracks skip the TCP+TLS handshakes to the same edges.
+_tls = threading.local()
+
+def _stop_hook(d: dict) -> None:
+    # Download threads never see SIGINT (and are joined at exit): abort mid-transfer instead,
+    # at the next chunk after the calling thread's stop event is set
+    stop = getattr(_tls, "stop", None)
+    if stop is not None and stop.is_set():
+        _tls.aborted = d.get("filename")
+        raise yt_dlp.utils.DownloadCancelled("stop requested")
+
+def api_ytdlp_once(opts_args: List[str], url: str, quiet: bool,
+                   stop: Optional[threading.Event] = None) -> Optional[Path]:
+    ydls: Dict[Tuple[str, ...], "yt_dlp.YoutubeDL"] = _tls.__dict__.setdefault("ydls", {})
+    _tls.stop, _tls.aborted = stop, None
+    try:
+        ydl = ydls.get(tuple(opts_args))
+        if ydl is None:
+            opts = yt_dlp.parse_options(list(opts_args)).ydl_opts
+            opts.update(quiet=True, no_warnings=True, noprogress=True)
+            opts["progress_hooks"] = opts.get("progress_hooks", []) + [_stop_hook]
+            ydl = ydls[tuple(opts_args)] = yt_dlp.YoutubeDL(opts)
+        info = ydl.extract_info(url, download=True)
+    except yt_dlp.utils.DownloadCancelled:
+        # --no-part: the truncated file sits under the final name, where yt-dlp would
+        # later take it for "already downloaded"
+        if _tls.aborted:
+            _safe_unlink(Path(_tls.aborted), True)
+        return None
+    except Exception as e:
+        log(f"[!] yt-dlp failed: {url}\n{e}", quiet)
+        return None
+    if not info:
+        log(f"[!] yt-dlp failed: {url}", quiet)
+        return None
+    # final path after postprocessing (e.g. -x renames to the audio extension)
+    dl = (info.get("requested_downloads") or [{}])[-1]
+    out = Path(dl.get("filepath") or ydl.prepare_filename(info))
+    if not out.exists():
+        log(f"[!] Download reported but file missing: {out}", quiet)
+        return None
+    return out
+
+# Completed downloads in the cache dir: file name -> {"size", "atime"}. A file named after
+# a video id is only trusted through this index (with --no-part an interrupted download
+# leaves a truncated file under the final name); it also drives the size-capped LRU trim.
+CACHE_INDEX = "cache_index.json"
+_index_lock = threading.Lock()
+
+def _load_index(cachedir: Path) -> Dict[str, Dict[str, float]]:
+    try:
+        return json.loads((cachedir / CACHE_INDEX).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _save_index(cachedir: Path, index: Dict[str, Dict[str, float]]) -> None:
+    tmp = cachedir / (CACHE_INDEX + ".tmp")
+    tmp.write_text(json.dumps(index), encoding="utf-8")
+    os.replace(tmp, cachedir / CACHE_INDEX)
+
+def cache_lookup(cachedir: Path, vid: str, suffix: Optional[str], quiet: bool = False) -> Optional[Path]:
+    """A complete earlier download of `vid` (with `suffix`, if given) still in cachedir."""
+    with _index_lock:
+        index = _load_index(cachedir)
+        for name, meta in index.items():
+            if f"[{vid}]." not in name or (suffix and not name.endswith(suffix)):
+                continue
+            p = cachedir / name
+            try:
+                if p.stat().st_size != meta.get("size"):
+                    continue
+            except OSError:
+                continue
+            meta["atime"] = time.time()
+            try:
+                _save_index(cachedir, index)
+            except OSError as e:
+                # the hit is still good; only its LRU position goes stale
+                log(f"[!] Could not update {CACHE_INDEX}: {e}", quiet)
+            return p
+    return None
+
+def _trim(cachedir: Path, index: Dict[str, Dict[str, float]], max_bytes: int, keep: int,
+          quiet: bool) -> None:
+    # Only indexed files are ever evicted: cachedir may be shared (liquid_radio downloads into
+    # the same default dir with the same names), and an unindexed file may still be downloading.
+    # One scandir pass also forgets files the rolling delete (or the user) already removed.
+    with os.scandir(cachedir) as it:
+        sizes = {e.name: e.stat().st_size for e in it if e.name in index and e.is_file()}
+    for name in [n for n in index if n not in sizes]:
+        del index[name]
+    if max_bytes <= 0:
+        return
+    total = sum(sizes.values())
+    by_age = sorted(index, key=lambda n: index[n]["atime"])
+    # the `keep` most recent are playing / queued to play: never evicted
+    for name in by_age[:max(0, len(by_age) - keep)]:
+        if total <= max_bytes:
+            break
+        try:
+            (cachedir / name).unlink()
+            log(f"[x] Evicted from cache: {name}", quiet)
+        except OSError:
+            continue
+        total -= sizes[name]
+        del index[name]
+
+def cache_record(cachedir: Path, path: Path, max_bytes: int, keep: int, quiet: bool) -> None:
+    """Index a finished download, then trim least recently used files down to max_bytes."""
+    with _index_lock:
+        index = _load_index(cachedir)
+        index[path.name] = {"size": path.stat().st_size, "atime": time.time()}
+        _trim(cachedir, index, max_bytes, keep, quiet)
+        _save_index(cachedir, index)
+
+def cache_trim(cachedir: Path, max_bytes: int, quiet: bool) -> None:
+    """Startup pass: apply max_bytes (it may have been lowered) before anything downloads."""
+    with _index_lock:
+        index = _load_index(cachedir)
+        _trim(cachedir, index, max_bytes, 0, quiet)
+        _save_index(cachedir, index)
+
+def ytdlp_download_smart(ytdlp: Optional[str], url: str, cachedir: Path,
                          direct: bool, audio_format: str, audio_quality: str,
-                         user_extra: List[str], quiet: bool) -> Optional[Path]:
+                         user_extra: List[str], quiet: bool, fragments: int = 4,
+                         max_bytes: int = 0, keep: int = 0,
+                         stop: Optional[threading.Event] = None) -> Optional[Path]:
     """
     Robust downloader:
       1) Try with user args.
       2) If SABR/416 or signature issues, retry with Android client.
       3) Final attempt with Android + small http-chunk-size.
+    ytdlp=None runs them through the in-process yt_dlp module instead of the binary.
+    A complete earlier download of the same video is reused without any network.
+    Setting stop abandons the remaining strategies (and cuts the backoff short).
     """
     cachedir.mkdir(parents=True, exist_ok=True)
     template = str(cachedir / "%(title).200s [%(id)s].%(ext)s")
 
-    base = build_ytdlp_cmd_base(ytdlp, template, direct, audio_format, audio_quality)
+    vid = parse_id(url)
+    if vid:
+        hit = cache_lookup(cachedir, vid, None if direct else f".{audio_format}", quiet)
+        if hit:
+            log(f"[✓] Cached -> {hit.name}", quiet)
+            return hit
+
+    base = build_ytdlp_cmd_base(ytdlp, template, direct, audio_format, audio_quality, fragments)
 
     # assemble strategies
     strategies: List[List[str]] = []
@@ -129,14 +486,28 @@ def ytdlp_download_smart(ytdlp: str, url: str, cachedir: Path,
 
     # Try each strategy
     for i, extra in enumerate(strategies, start=1):
+        if stop is not None and stop.is_set():
+            return None
         label = "user-args" if i == 1 else ("android" if i == 2 else "android+chunk")
         log(f"[*] Downloading ({'direct' if direct else 'extract'}:{label}): {url}", quiet)
-        out = try_ytdlp_once(base + extra, url, quiet)
+        if ytdlp:
+            out = try_ytdlp_once(base + extra, url, quiet)
+        else:
+            out = api_ytdlp_once(base + extra, url, quiet, stop)
         if out:
             log(f"[✓] Downloaded -> {out.name}", quiet)
+            try:
+                cache_record(cachedir, out, max_bytes, keep, quiet)
+            except OSError as e:
+                log(f"[!] Could not update {CACHE_INDEX}: {e}", quiet)
             return out
-        # small backoff before next attempt
-        time.sleep(1.0)
+        # capped exponential backoff with full jitter before the next attempt
+        if i < len(strategies):
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 1.5 ** i))
+            if stop is None:
+                time.sleep(delay)
+            elif stop.wait(delay):
+                return None
 
     # last resort: if user didn’t supply cookies and still failing, hint them
     log("[!] All strategies failed. Consider adding '--ytdlp-arg --cookies-from-browser chrome' "
@@ -161,14 +532,27 @@ def main():
     ap.add_argument("--cache-dir", default="cache", help="Folder for downloaded tracks (rolling)")
     ap.add_argument("--jingles-dir", default="jingles_mp3", help="Folder with jingle files")
     ap.add_argument("--jingle-period", type=int, default=5, help="Play one random jingle every N songs (0=off)")
-    ap.add_argument("--ytdlp", default=YTDLP_DEFAULT, help="Path to yt-dlp")
+    ap.add_argument("--ytdlp", default=YTDLP_DEFAULT,
+                    help="Path to yt-dlp (only used without the yt_dlp module, or with --subprocess)")
+    ap.add_argument("--subprocess", action="store_true",
+                    help="Exec the --ytdlp binary per track even when the yt_dlp module is importable")
     ap.add_argument("--mpv", default=MPV_DEFAULT, help="Path to mpv")
+    ap.add_argument("--no-mpv-ipc", action="store_true",
+                    help="Start a new mpv per track instead of one persistent mpv driven over IPC")
     ap.add_argument("--shuffle", action="store_true", help="Shuffle the URL list once at start")
+    ap.add_argument("--seed", type=int, default=None,
+                    help="Seed for --shuffle (same seed + same list = same order; logged when omitted)")
     ap.add_argument("--audio-format", default="m4a", choices=["mp3","m4a","wav","flac"],
                     help="Target format if --extract is used")
     ap.add_argument("--audio-quality", default="0", help="yt-dlp --audio-quality (0=best, 5=mid, 9=worst)")
     ap.add_argument("--extract", action="store_true",
                     help="Transcode to --audio-format (slower). Default is direct bestaudio (fast)")
+    ap.add_argument("--concurrent-fragments", type=int, default=4,
+                    help="yt-dlp --concurrent-fragments per download (fragmented HLS/DASH formats)")
+    ap.add_argument("--prefetch", type=int, default=3,
+                    help="Tracks downloading/ready ahead of the one playing (parallel downloads)")
+    ap.add_argument("--cache-max-mb", type=int, default=2048,
+                    help="Trim least recently used tracks in --cache-dir above this size (0=no cap)")
     ap.add_argument("--no-delete", action="store_true", help="Do not delete previous songs (debug)")
     ap.add_argument("--verbose", action="store_true", help="Louder logs")
     ap.add_argument("--quiet", action="store_true", help="Minimal logs")
@@ -196,21 +580,35 @@ def main():
         print(f"[!] Missing {urls_path}", file=sys.stderr)
         sys.exit(2)
 
-    urls = [ln.strip() for ln in urls_path.read_text(encoding="utf-8").splitlines() if ln.strip()]
+    lines = read_url_lines(urls_path)
+    # drop repeats (concatenated mix runs), keeping first-seen order; keyed by video id so
+    # youtu.be/X and watch?v=X count as one (they'd share, and rolling-delete, one cached file)
+    first: Dict[str, str] = {}
+    for u in lines:
+        first.setdefault(parse_id(u) or u, u)
+    urls = list(first.values())
     if not urls:
         print("[!] No URLs found.", file=sys.stderr)
         sys.exit(2)
+    if len(urls) < len(lines):
+        log(f"[i] Deduped {len(lines) - len(urls)} duplicate URL(s)", quiet)
 
     if args.shuffle:
-        random.shuffle(urls)
+        seed = args.seed if args.seed is not None else random.randrange(2**32)
+        random.Random(seed).shuffle(urls)
+        log(f"[i] Shuffled with --seed {seed}", quiet)
 
     cachedir = Path(args.cache_dir)
     cachedir.mkdir(parents=True, exist_ok=True)
+    try:
+        cache_trim(cachedir, args.cache_max_mb * 1024 * 1024, quiet)
+    except OSError as e:
+        log(f"[!] Could not trim {cachedir}: {e}", quiet)
 
     jroot = Path(args.jingles_dir)
     jingles: List[Path] = []
     if args.jingle_period > 0 and jroot.exists():
-        jingles = [p for p in jroot.rglob("*") if p.suffix.lower() in (".mp3", ".m4a", ".wav", ".flac")]
+        jingles = find_audio(jroot)
         if not jingles:
             log(f"[!] No audio files in {jroot}. Jingles disabled.", quiet)
             args.jingle_period = 0
@@ -218,88 +616,125 @@ def main():
         if args.jingle_period > 0:
             log(f"[!] Jingles dir not found: {jroot} (disabling jingles)", quiet)
             args.jingle_period = 0
+    picks = jingle_picker(jingles) if jingles else None
 
-    log(f"[i] Using yt-dlp: {args.ytdlp}", quiet)
+    # None = in-process yt_dlp module; otherwise the binary to exec
+    ytdlp = None if (yt_dlp is not None and not args.subprocess) else args.ytdlp
+
+    log(f"[i] Using yt-dlp: {'in-process ' + yt_dlp.version.__version__ if ytdlp is None else ytdlp}", quiet)
     log(f"[i] Using mpv   : {args.mpv}", quiet)
     log(f"[i] URLs loaded : {len(urls)}", quiet)
     log(f"[i] Cache dir   : {cachedir.resolve()}", quiet)
     if args.jingle_period > 0:
         log(f"[i] Jingles    : {len(jingles)} files | period: {args.jingle_period}", quiet)
 
-    stopping = False
+    # Set from SIGINT; checked by playback polling and by the download retry loop
+    stop = threading.Event()
     def handle_sigint(sig, frame):
-        nonlocal stopping
-        stopping = True
+        stop.set()
         print("\n[!] Stopping…", file=sys.stderr)
     signal.signal(signal.SIGINT, handle_sigint)
 
-    executor = cf.ThreadPoolExecutor(max_workers=1)
+    # One persistent mpv for the whole session where Unix sockets exist (not on Windows)
+    player: Optional[MpvIPC] = None
+    if not args.no_mpv_ipc and hasattr(socket, "AF_UNIX"):
+        player = MpvIPC(args.mpv, build_mpv_base_args(quiet) + mpv_extra)
+
+    # Up to --prefetch downloads in flight/ready, consumed in URL order; the deque
+    # bound is what keeps submissions from running ahead of playback.
+    prefetch = max(1, args.prefetch)
+    executor = cf.ThreadPoolExecutor(max_workers=prefetch)
+    pending: deque = deque()
+    next_idx = 0
+
+    # Janitor: rolling deletes (and cache hints) on their own thread, so they never wait
+    # behind downloads and the player never waits on them. None ends it.
+    chores: queue.Queue = queue.Queue()
+    def janitor():
+        for chore in iter(chores.get, None):
+            chore()
+    janitor_thread = threading.Thread(target=janitor, name="janitor", daemon=True)
+    janitor_thread.start()
 
     def submit_download(u: str):
         return executor.submit(
             ytdlp_download_smart,
-            args.ytdlp, u, cachedir,
+            ytdlp, u, cachedir,
             (not args.extract),  # direct if no --extract
             args.audio_format, args.audio_quality,
-            ytdlp_extra, quiet
+            ytdlp_extra, quiet, args.concurrent_fragments,
+            args.cache_max_mb * 1024 * 1024, prefetch + 2,  # current + previous + the window
+            stop,
         )
 
+    def top_up():
+        nonlocal next_idx
+        while len(pending) < prefetch and next_idx < len(urls):
+            pending.append(submit_download(urls[next_idx]))
+            next_idx += 1
+
     idx = 0
     prev_song: Optional[Path] = None
     play_count = 0
 
-    # Kick off first download
-    dl_future: Optional[cf.Future] = submit_download(urls[idx])
+    # Kick off the first downloads
+    top_up()
 
     try:
-        while not stopping and idx < len(urls):
-            cur_path = dl_future.result() if dl_future else None
+        while not stop.is_set() and pending:
+            fut = pending.popleft()
+            # Don't sit out a slow download once Ctrl-C has been pressed
+            while not fut.done() and not stop.is_set():
+                cf.wait([fut], timeout=POLL_SECONDS)
+            if stop.is_set():
+                break
+            cur_path = fut.result()
+
+            # Refill ASAP so the window stays full while this one plays
+            top_up()
 
             if cur_path is None:
                 log(f"[!] Skipping failed download: {urls[idx]}", quiet)
                 idx += 1
-                if idx < len(urls):
-                    dl_future = submit_download(urls[idx])
-                    continue
-                else:
-                    break
+                continue
 
-            # Prefetch next ASAP
-            next_future: Optional[cf.Future] = None
-            if idx + 1 < len(urls):
-                next_future = submit_download(urls[idx + 1])
+            # Ctrl-C may have landed meanwhile: don't start (or restart) mpv just to stop it
+            if stop.is_set():
+                break
+
+            # Rolling delete: nuke previous file right as the next starts, off the
+            # playback path (unlink can be slow on WSL/NTFS or USB sticks)
+            if not args.no_delete and prev_song and prev_song != cur_path:
+                chores.put(partial(_safe_unlink, prev_song, quiet))
 
             # Play current
-            rc = mpv_play(args.mpv, cur_path, mpv_extra, quiet)
+            rc = mpv_play(args.mpv, cur_path, mpv_extra, quiet, player, stop.is_set)
             play_count += 1
 
             # Every N songs, play a random jingle (never deleted)
-            if args.jingle_period > 0 and (play_count % args.jingle_period == 0) and jingles:
-                jingle = random.choice(jingles)
+            if (args.jingle_period > 0 and (play_count % args.jingle_period == 0) and jingles
+                    and not stop.is_set()):
+                jingle = next(picks)
                 log(f"[♪] JINGLE: {jingle.name}", quiet)
-                _ = mpv_play(args.mpv, jingle, mpv_extra, quiet)
+                _ = mpv_play(args.mpv, jingle, mpv_extra, quiet, player, stop.is_set)
 
-            # Rolling delete: nuke previous file right after next starts
-            if not args.no_delete and prev_song and prev_song.exists():
-                try:
-                    prev_song.unlink()
-                    log(f"[x] Deleted previous: {prev_song.name}", quiet)
-                except Exception as e:
-                    log(f"[!] Could not delete {prev_song}: {e}", quiet)
+            if args.no_delete:
+                # Kept on disk but done with: don't let it crowd the page cache
+                chores.put(partial(drop_page_cache, cur_path))
 
             prev_song = cur_path
 
             # Advance
-            dl_future = next_future
             idx += 1
 
-            if dl_future is None:
-                # No more tracks queued
-                break
-
         log(f"[✓] Done. Played {play_count} song(s).", quiet)
     finally:
-        executor.shutdown(wait=False)
+        executor.shutdown(wait=False, cancel_futures=True)
+        # Let the janitor finish the deletes already handed to it
+        chores.put(None)
+        janitor_thread.join()
+        if player is not None:
+            player.close()
 
 if __name__ == "__main__":
     main()
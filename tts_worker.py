@@ -1,20 +1,56 @@
 #!/usr/bin/env python3
-import os, hashlib, requests
+import os, asyncio, functools, hashlib, threading, requests
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+try:
+    from blake3 import blake3  # SIMD hashing; sha256 (SHA-NI via OpenSSL) otherwise
+except ImportError:
+    blake3 = None
+
+try:
+    import aiohttp  # tts_many fetches clips concurrently on one loop; threads otherwise
+except ImportError:
+    aiohttp = None
+
 load_dotenv()
 EL_API  = os.getenv("ELEVENLABS_API_KEY","")
 VOICEID = os.getenv("ELEVENLABS_VOICE_ID","")
 OUTDIR  = Path("cache/tts")
 OUTDIR.mkdir(parents=True, exist_ok=True)
+CHUNK = 524288
+MAX_PARALLEL = 4  # concurrent TTS requests in tts_many (ElevenLabs caps these per plan)
 
-def tts_to_file(text:str, voice_id:str=None, fmt:str="mp3")->Path:
+# One keep-alive pool for every clip: no fresh TCP+TLS handshake per host line
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_PARALLEL))
+
+def warm_up():
+    """Open the pooled API connection in the background, so the first clip skips DNS+TCP+TLS."""
+    if not EL_API:
+        return
+    def _head():
+        try:
+            SESSION.head("https://api.elevenlabs.io/", timeout=10)
+        except requests.RequestException:
+            pass  # the first real request just connects itself
+    threading.Thread(target=_head, daemon=True).start()
+
+@functools.lru_cache(maxsize=1024)  # host lines repeat (intros, sign-offs)
+def text_key(text:str, voice:str="")->str:
+    # 16 hex chars either way; the voice is part of the key so switching voices
+    # doesn't replay clips spoken by the old one (older text-only names are fetched once more)
+    data = f"{voice}|{text}".encode("utf-8")
+    if blake3 is not None:
+        return blake3(data).hexdigest(length=8)
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def _request(text:str, voice_id:str=None, fmt:str="mp3"):
+    """-> (cached output path, url, headers, body) for one clip."""
     voice = voice_id or VOICEID
-    h = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+    h = text_key(text, voice)
     out = OUTDIR / f"host_{h}.{fmt}"
-    if out.exists():
-        return out
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice}"
     headers = {
         "xi-api-key": EL_API,
@@ -26,14 +62,64 @@ def tts_to_file(text:str, voice_id:str=None, fmt:str="mp3")->Path:
         "model_id": "eleven_multilingual_v2",
         "voice_settings": {"stability": 0.4, "similarity_boost": 0.85, "style": 0.4, "use_speaker_boost": True}
     }
-    with requests.post(url, headers=headers, json=body, stream=True, timeout=90) as r:
+    return out, url, headers, body
+
+def tts_to_file(text:str, voice_id:str=None, fmt:str="mp3")->Path:
+    out, url, headers, body = _request(text, voice_id, fmt)
+    if out.exists():
+        return out
+    with SESSION.post(url, headers=headers, json=body, stream=True, timeout=90) as r:
         r.raise_for_status()
-        with out.open("wb") as f:
-            for chunk in r.iter_content(chunk_size=524288):
+        # write under a temp name: a half-fetched clip must never look cached
+        tmp = out.with_suffix(out.suffix + ".part")
+        with tmp.open("wb") as f:
+            for chunk in r.iter_content(chunk_size=CHUNK):
                 if chunk:
                     f.write(chunk)
+        os.replace(tmp, out)
     return out
 
+async def tts_to_file_async(text:str, voice_id:str=None, fmt:str="mp3", session=None)->Path:
+    """tts_to_file as a coroutine; pass a shared aiohttp session to reuse its connections."""
+    if aiohttp is None:
+        return await asyncio.to_thread(tts_to_file, text, voice_id, fmt)
+    out, url, headers, body = _request(text, voice_id, fmt)
+    if out.exists():
+        return out
+    own = session is None
+    if own:
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=90))
+    try:
+        async with session.post(url, headers=headers, json=body) as r:
+            r.raise_for_status()
+            # write under a temp name: a half-fetched clip must never look cached
+            tmp = out.with_suffix(out.suffix + ".part")
+            with tmp.open("wb") as f:
+                async for chunk in r.content.iter_chunked(CHUNK):
+                    f.write(chunk)
+            os.replace(tmp, out)
+    finally:
+        if own:
+            await session.close()
+    return out
+
+async def tts_many(texts, voice_id:str=None, fmt:str="mp3"):
+    """Clips for several texts at once (up to MAX_PARALLEL in flight); paths in input order."""
+    sem = asyncio.Semaphore(MAX_PARALLEL)
+    session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=90)) if aiohttp else None
+
+    async def one(text):
+        async with sem:
+            return await tts_to_file_async(text, voice_id, fmt, session)
+    try:
+        # one request per distinct text: the same clip must not be written twice at once
+        unique = list(dict.fromkeys(texts))
+        paths = dict(zip(unique, await asyncio.gather(*(one(t) for t in unique))))
+        return [paths[t] for t in texts]
+    finally:
+        if session is not None:
+            await session.close()
+
 if __name__ == "__main__":
     p = tts_to_file("This is Qualisys FM. Coding by day, vibes by night.")
     print(p)